@@ -1,15 +1,27 @@
 """Image generation service - reuses existing generation logic from frontend"""
 
-import httpx
-import base64
-from pathlib import Path
-from datetime import datetime
-import re
-import os
+import asyncio
+import functools
+import json
 import logging
+import mmap
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Final
+from urllib.parse import quote, urlparse
+from uuid import uuid4
+
+import httpx
+import orjson
+import pybase64
 
 logger = logging.getLogger(__name__)
 
+# Log which base64 backend is active (SIMD path, or plain C/Python fallback on older CPUs)
+logger.info(f"pybase64 {pybase64.get_version()}")
+
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 BETA_DIR = BASE_DIR / "beta"
@@ -18,14 +30,91 @@ TO_BE_PROCESSED_DIR = BETA_DIR / "to-be-processed"
 # Ensure directory exists
 TO_BE_PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
+# Map friendly model names to API model IDs
+_MODEL_MAP: Final[dict[str, str]] = {
+    "Gemini 3": "google/gemini-3-pro-image-preview",
+    "GPT Image": "gpt-image-1.5",
+    "Flux 2": "black-forest-labs/flux.2-pro",
+}
+
+# OpenRouter quality configuration
+_QUALITY_CONFIG: Final[dict[str, dict]] = {
+    "low": {"gemini_size": "1K", "flux_steps": 15},
+    "medium": {"gemini_size": "1K", "flux_steps": 28},
+    "high": {"gemini_size": "2K", "flux_steps": 50}
+}
+_DEFAULT_QUALITY: Final[dict] = _QUALITY_CONFIG["medium"]
+
+# Map aspect ratio to OpenAI image size
+_SIZE_MAP: Final[dict[str, str]] = {
+    "1:1": "1024x1024",
+    "16:9": "1792x1024",
+    "9:16": "1024x1792",
+    "4:3": "1024x1024",  # Fallback to square
+    "3:4": "1024x1024",  # Fallback to square
+}
+
+# Image mime type by file suffix
+_MIME_BY_SUFFIX: Final[dict[str, str]] = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".png": "image/png",
+}
+
+# Characters dropped from prompts when building filenames
+_FILENAME_STRIP: Final = re.compile(r'[^a-zA-Z0-9\s]', re.ASCII)
+
+_JSON_DECODER: Final = json.JSONDecoder()
+
+# Shared HTTP client - keeps connections to OpenRouter/OpenAI alive between calls
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared HTTP/2 client"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(180, connect=10),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client (called on app shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
+
+@functools.cache
 def get_api_keys() -> tuple[str, str]:
-    """Get API keys from environment"""
+    """Get API keys from environment (read once - call get_api_keys.cache_clear() to reload)"""
     or_key = os.environ.get("OPENROUTER_API_KEY", "")
     oai_key = os.environ.get("OPENAI_API_KEY", "")
     return or_key, oai_key
 
 
+@functools.cache
+def get_public_base_url() -> str:
+    """Get the public base URL the /beta mount is served at, or "" if it is local-only"""
+    public_base = os.environ.get("PUBLIC_URL", "").rstrip("/")
+    # The default localhost URL is not reachable by upstream APIs
+    if urlparse(public_base).hostname in (None, "localhost", "127.0.0.1"):
+        return ""
+    return public_base
+
+
+def to_data_url(data: bytes | bytearray | mmap.mmap, mime: str) -> str:
+    """Encode raw image bytes as a base64 data URL"""
+    # b64encode_as_string goes straight to an ASCII str, so the URL is built with one copy
+    return f"data:{mime};base64,{pybase64.b64encode_as_string(data)}"
+
+
 async def generate_image(
     prompt: str,
     model: str,
@@ -48,13 +137,7 @@ async def generate_image(
     """
     refs = refs or []
 
-    # Map friendly model names to API model IDs
-    model_map = {
-        "Gemini 3": "google/gemini-3-pro-image-preview",
-        "GPT Image": "gpt-image-1.5",
-        "Flux 2": "black-forest-labs/flux.2-pro",
-    }
-    model_id = model_map.get(model, model)
+    model_id = _MODEL_MAP.get(model, model)
 
     if "gpt-image" in model_id.lower() or model == "GPT Image":
         image_data = await generate_with_openai(prompt, refs, quality, aspect)
@@ -62,7 +145,7 @@ async def generate_image(
         image_data = await generate_with_openrouter(model_id, prompt, refs, aspect, quality)
 
     # Save to disk
-    filename = save_image_to_disk(image_data, prompt, model_id)
+    filename = await save_image_to_disk(image_data, prompt, model_id)
 
     return {
         "filename": f"to-be-processed/{filename}",
@@ -70,6 +153,25 @@ async def generate_image(
     }
 
 
+async def _fetch_ref(client: httpx.AsyncClient, ref_url: str) -> dict | None:
+    """Fetch a reference image as an image_url content part, or None if it fails"""
+    try:
+        # Stream straight into one buffer, then encode it in a single pass
+        buf = bytearray()
+        async with client.stream("GET", ref_url, timeout=60) as resp:
+            resp.raise_for_status()
+            mime = resp.headers.get("content-type", "image/png")
+            async for chunk in resp.aiter_bytes():
+                buf += chunk
+        return {
+            "type": "image_url",
+            "image_url": {"url": to_data_url(buf, mime)}
+        }
+    except Exception as e:
+        logger.warning(f"Failed to fetch reference image {ref_url}: {e}")
+        return None
+
+
 async def generate_with_openrouter(
     model: str,
     prompt: str,
@@ -83,38 +185,10 @@ async def generate_with_openrouter(
     if not or_key:
         raise ValueError("OPENROUTER_API_KEY not set")
 
-    content = []
-
-    # Add reference images as base64 if provided
-    if refs:
-        async with httpx.AsyncClient(timeout=60) as client:
-            for ref_url in refs:
-                try:
-                    resp = await client.get(ref_url)
-                    resp.raise_for_status()
-                    b64 = base64.b64encode(resp.content).decode()
-                    mime = resp.headers.get("content-type", "image/png")
-                    content.append({
-                        "type": "image_url",
-                        "image_url": {"url": f"data:{mime};base64,{b64}"}
-                    })
-                except Exception as e:
-                    logger.warning(f"Failed to fetch reference image {ref_url}: {e}")
-
-    # Add prompt text
-    prompt_text = f"Using the reference images: {prompt}" if refs else prompt
-    content.append({"type": "text", "text": prompt_text})
-
-    # Quality configuration
-    quality_config = {
-        "low": {"gemini_size": "1K", "flux_steps": 15},
-        "medium": {"gemini_size": "1K", "flux_steps": 28},
-        "high": {"gemini_size": "2K", "flux_steps": 50}
-    }.get(quality, {"gemini_size": "1K", "flux_steps": 28})
+    quality_config = _QUALITY_CONFIG.get(quality, _DEFAULT_QUALITY)
 
     request_body = {
         "model": model,
-        "messages": [{"role": "user", "content": content if refs else prompt}],
         "modalities": ["text", "image"],
         "image_config": {"aspect_ratio": aspect}
     }
@@ -126,17 +200,30 @@ async def generate_with_openrouter(
             "flux": {"num_inference_steps": quality_config["flux_steps"]}
         }
 
-    async with httpx.AsyncClient(timeout=180) as client:
-        resp = await client.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {or_key}",
-                "Content-Type": "application/json"
-            },
-            json=request_body
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    client = get_http_client()
+    content = []
+
+    # Add reference images as base64 if provided, fetched concurrently
+    if refs:
+        results = await asyncio.gather(*[_fetch_ref(client, u) for u in refs])
+        content.extend(r for r in results if r)
+
+    # Add prompt text
+    prompt_text = f"Using the reference images: {prompt}" if refs else prompt
+    content.append({"type": "text", "text": prompt_text})
+
+    request_body["messages"] = [{"role": "user", "content": content if refs else prompt}]
+
+    resp = await client.post(
+        "https://openrouter.ai/api/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {or_key}",
+            "Content-Type": "application/json"
+        },
+        content=orjson.dumps(request_body)
+    )
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
 
     # Extract image from response
     message = data.get("choices", [{}])[0].get("message", {})
@@ -168,37 +255,29 @@ async def generate_with_openai(
     if not oai_key:
         raise ValueError("OPENAI_API_KEY not set")
 
-    # Map aspect ratio to size
-    size_map = {
-        "1:1": "1024x1024",
-        "16:9": "1792x1024",
-        "9:16": "1024x1792",
-        "4:3": "1024x1024",  # Fallback to square
-        "3:4": "1024x1024",  # Fallback to square
-    }
-    size = size_map.get(aspect, "1024x1024")
+    size = _SIZE_MAP.get(aspect, "1024x1024")
 
     # Map quality
     oai_quality = "hd" if quality == "high" else "standard"
 
-    async with httpx.AsyncClient(timeout=180) as client:
-        resp = await client.post(
-            "https://api.openai.com/v1/images/generations",
-            headers={
-                "Authorization": f"Bearer {oai_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "gpt-image-1",
-                "prompt": prompt,
-                "n": 1,
-                "size": size,
-                "quality": oai_quality,
-                "response_format": "b64_json"
-            }
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    client = get_http_client()
+    resp = await client.post(
+        "https://api.openai.com/v1/images/generations",
+        headers={
+            "Authorization": f"Bearer {oai_key}",
+            "Content-Type": "application/json"
+        },
+        content=orjson.dumps({
+            "model": "gpt-image-1",
+            "prompt": prompt,
+            "n": 1,
+            "size": size,
+            "quality": oai_quality,
+            "response_format": "b64_json"
+        })
+    )
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
 
     # Extract image data
     image_data = data.get("data", [{}])[0]
@@ -211,12 +290,49 @@ async def generate_with_openai(
     raise ValueError("No image in OpenAI response")
 
 
-def save_image_to_disk(image_data: str, prompt: str, model: str) -> str:
+def reserve_path(directory: Path, stem: str, suffix: str) -> Path:
+    """Atomically create an empty file for stem+suffix (random suffix on collision) and return it"""
+    path = directory / f"{stem}{suffix}"
+    try:
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+    except FileExistsError:
+        path = directory / f"{stem}_{uuid4().hex[:8]}{suffix}"
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+    return path
+
+
+def _write_file(filepath: Path, data: bytes):
+    """Write bytes into a reserved file with raw os.write calls (no Python file object buffering)"""
+    fd = os.open(filepath, os.O_WRONLY | os.O_TRUNC)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+async def _download_to_file(url: str, filepath: Path):
+    """Stream a remote image straight to disk instead of buffering the whole body"""
+    try:
+        async with get_http_client().stream("GET", url, timeout=60) as resp:
+            resp.raise_for_status()
+            # 1 MiB buffer - chunks land in the page cache, flushed in large sequential writes
+            with open(filepath, "r+b", buffering=1024 * 1024) as f:
+                async for chunk in resp.aiter_bytes(64 * 1024):
+                    f.write(chunk)
+    except BaseException:
+        # Release the reserved name on failure
+        filepath.unlink(missing_ok=True)
+        raise
+
+
+async def save_image_to_disk(image_data: str, prompt: str, model: str) -> str:
     """Save base64/URL image to disk, return filename"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
     # Clean prompt for filename (first 30 chars)
-    clean_prompt = re.sub(r'[^a-zA-Z0-9\s]', '', prompt)[:30]
+    clean_prompt = _FILENAME_STRIP.sub('', prompt)[:30]
     clean_prompt = clean_prompt.strip().replace(' ', '-').lower()
     if not clean_prompt:
         clean_prompt = "generated"
@@ -224,15 +340,13 @@ def save_image_to_disk(image_data: str, prompt: str, model: str) -> str:
     # Get model short name
     model_short = model.split('/')[-1].split('-')[0][:10]
 
-    filename = f"{timestamp}_{model_short}_{clean_prompt}.png"
-    filepath = TO_BE_PROCESSED_DIR / filename
+    # Reserve the name up front - parallel generations can share a timestamp and prompt prefix
+    filepath = reserve_path(TO_BE_PROCESSED_DIR, f"{timestamp}_{model_short}_{clean_prompt}", ".png")
+    filename = filepath.name
 
     # Handle URL - download first
     if image_data.startswith('http'):
-        import httpx
-        resp = httpx.get(image_data, timeout=60)
-        resp.raise_for_status()
-        filepath.write_bytes(resp.content)
+        await _download_to_file(image_data, filepath)
         logger.info(f"Saved image from URL: {filename}")
         return filename
 
@@ -240,12 +354,44 @@ def save_image_to_disk(image_data: str, prompt: str, model: str) -> str:
     if image_data.startswith('data:'):
         image_data = image_data.split(',')[1]
 
-    # Decode base64 and save
-    filepath.write_bytes(base64.b64decode(image_data))
+    # Decode base64 and save - both are off the event loop
+    try:
+        raw_bytes = await asyncio.to_thread(pybase64.b64decode, image_data, validate=False)
+        await asyncio.to_thread(_write_file, filepath, raw_bytes)
+    except BaseException:
+        filepath.unlink(missing_ok=True)
+        raise
     logger.info(f"Saved image from base64: {filename}")
     return filename
 
 
+def _file_to_data_url(path: Path, mime: str) -> str:
+    """Encode a local image as a data URL straight from a memory map (no intermediate bytes copy)"""
+    with open(path, "rb") as f:
+        # mmap can't map a zero-byte file - e.g. a reserved name whose image is still being written
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"Image is empty or not ready yet: {path.name}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return to_data_url(mm, mime)
+
+
+def _extract_caption_json(text: str) -> dict | None:
+    """Extract the first JSON object with a "caption" key from model output, ignoring anything around it"""
+    # raw_decode parses from an offset and reports where the object ends,
+    # so trailing text or ``` fences after the JSON don't matter
+    start = text.find('{')
+    while start != -1:
+        try:
+            result, _ = _JSON_DECODER.raw_decode(text, start)
+            if isinstance(result, dict) and "caption" in result:
+                return result
+        except json.JSONDecodeError:
+            pass
+        start = text.find('{', start + 1)
+
+    return None
+
+
 async def generate_caption(
     image_path: str,
     platforms: list[str] = None,
@@ -269,20 +415,18 @@ async def generate_caption(
     platforms = platforms or ["Instagram"]
     platform_str = ", ".join(platforms)
 
-    # Load image as base64
     full_path = BETA_DIR / image_path
     if not full_path.exists():
         raise ValueError(f"Image not found: {image_path}")
 
-    with open(full_path, "rb") as f:
-        image_data = base64.b64encode(f.read()).decode()
+    # When the /beta mount is publicly reachable, let OpenRouter fetch the image itself
+    public_base = get_public_base_url()
+    if public_base and full_path.resolve().is_relative_to(BETA_DIR.resolve()):
+        image_url = f"{public_base}/beta/{quote(image_path)}"
+    else:
+        mime = _MIME_BY_SUFFIX.get(full_path.suffix.lower(), "image/png")
 
-    # Detect mime type
-    mime = "image/png"
-    if image_path.lower().endswith(".jpg") or image_path.lower().endswith(".jpeg"):
-        mime = "image/jpeg"
-    elif image_path.lower().endswith(".webp"):
-        mime = "image/webp"
+        image_url = await asyncio.to_thread(_file_to_data_url, full_path, mime)
 
     # Build the prompt
     prompt = f"""You are a social media content creator for an AI-generated lifestyle influencer named Naina.
@@ -311,43 +455,38 @@ Generate 5-8 relevant hashtags. Include a mix of popular and niche tags."""
     content = [
         {
             "type": "image_url",
-            "image_url": {"url": f"data:{mime};base64,{image_data}"}
+            "image_url": {"url": image_url}
         },
         {"type": "text", "text": prompt}
     ]
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {or_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "google/gemini-2.5-flash",
-                "messages": [{"role": "user", "content": content}],
-            }
-        )
-        resp.raise_for_status()
-        data = resp.json()
+    client = get_http_client()
+    resp = await client.post(
+        "https://openrouter.ai/api/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {or_key}",
+            "Content-Type": "application/json"
+        },
+        content=orjson.dumps({
+            "model": "google/gemini-2.5-flash",
+            "messages": [{"role": "user", "content": content}],
+        }),
+        timeout=60
+    )
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
 
     # Extract response text
     message = data.get("choices", [{}])[0].get("message", {})
     text = message.get("content", "")
 
     # Parse JSON from response
-    import json
-    try:
-        # Try to find JSON in the response
-        json_match = re.search(r'\{[^{}]*"caption"[^{}]*\}', text, re.DOTALL)
-        if json_match:
-            result = json.loads(json_match.group())
-            return {
-                "caption": result.get("caption", ""),
-                "hashtags": result.get("hashtags", "")
-            }
-    except json.JSONDecodeError:
-        pass
+    result = _extract_caption_json(text)
+    if result is not None:
+        return {
+            "caption": result.get("caption", ""),
+            "hashtags": result.get("hashtags", "")
+        }
 
     # Fallback: return raw text
     logger.warning(f"Could not parse JSON from Gemini response: {text[:200]}")
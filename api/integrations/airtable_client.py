@@ -1,15 +1,86 @@
 """Airtable integration for content calendar management"""
 
 from pyairtable import Api
-from typing import Optional, List
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from typing import Final, Optional, List
 from pydantic import BaseModel
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class _AirtableRetry(Retry):
+    """Retry 429 on every method (the request was never processed) and 5xx only on idempotent ones"""
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+# Map Python field names to Airtable field names (used by update_status)
+_FIELD_MAPPING: Final[dict[str, str]] = {
+    "postiz_post_id": "PostizPostId",
+    "published_at": "PublishedAt",
+    "image_url": "ImageURL",
+    "local_image_path": "LocalImagePath",
+    "error": "Error",
+}
+
+# Fields read by _to_content_record
+CONTENT_RECORD_FIELDS = [
+    "Title",
+    "Prompt",
+    "Status",
+    "Platforms",
+    "Caption",
+    "Hashtags",
+    "ImageURL",
+    "LocalImagePath",
+    "ScheduledDate",
+    "PostizPostId",
+    "Model",
+    "AspectRatio",
+    "Quality",
+    "ReferenceImages",
+    "Error",
+]
+
+# Subset needed to generate an image - skips captions, generated image and post fields
+GENERATION_FIELDS = [
+    "Title",
+    "Prompt",
+    "Status",
+    "Platforms",
+    "ScheduledDate",
+    "Model",
+    "AspectRatio",
+    "Quality",
+    "ReferenceImages",
+]
+
+# How long status counts are reused before Airtable is queried again (seconds)
+STATUS_COUNTS_TTL = 30
+
+# Fields read by get_posts_for_publishing - everything else is left out of the response
+PUBLISHING_FIELDS = [
+    "Title",
+    "ImageURL",
+    "LocalImagePath",
+    "Caption",
+    "Hashtags",
+    "Platforms",
+    "ScheduledDate",
+    "Status",
+]
+
+
 class ContentRecord(BaseModel):
     """Content record from Airtable Content Calendar"""
     id: str
@@ -40,26 +111,57 @@ class AirtableClient:
         if not pat or not base_id:
             raise ValueError("AIRTABLE_PAT and AIRTABLE_BASE_ID must be set")
 
-        self.api = Api(pat)
+        retry = _AirtableRetry(
+            total=5,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            # Field updates are idempotent, so PATCH joins the default verbs for 5xx retries
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"PATCH"},
+        )
+        # Retries are configured once, on the adapter below
+        self.api = Api(pat, retry_strategy=None)
+
+        # Long-lived keep-alive pool, sized to cover the executor's concurrent calls
+        self.api.session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+        )
         self.table = self.api.table(base_id, "Content Calendar")
 
+        # (fetched_at, counts) from the last get_status_counts call
+        self._status_counts_cache: Optional[tuple[float, dict]] = None
+
+        # pyairtable is blocking - async callers run it on this bounded pool
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="airtable")
+
+    async def _run(self, fn, *args, **kwargs):
+        """Run a blocking call on the Airtable thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
     def get_pending_generations(self) -> List[ContentRecord]:
         """Fetch records with Status = 'Idea' ready for generation"""
         try:
             records = self.table.all(
                 formula="{Status} = 'Idea'",
-                sort=["ScheduledDate"]
+                sort=["ScheduledDate"],
+                fields=GENERATION_FIELDS
             )
             return [self._to_content_record(r) for r in records]
         except Exception as e:
             logger.error(f"Failed to fetch pending generations: {e}")
             return []
 
+    async def aget_pending_generations(self) -> List[ContentRecord]:
+        """Async variant of get_pending_generations"""
+        return await self._run(self.get_pending_generations)
+
     def get_approved_for_scheduling(self) -> List[ContentRecord]:
         """Fetch records approved and ready to schedule"""
         try:
             records = self.table.all(
-                formula="{Status} = 'Approved'"
+                formula="{Status} = 'Approved'",
+                fields=CONTENT_RECORD_FIELDS
             )
             return [self._to_content_record(r) for r in records]
         except Exception as e:
@@ -70,7 +172,8 @@ class AirtableClient:
         """Fetch records pending review"""
         try:
             records = self.table.all(
-                formula="{Status} = 'Review'"
+                formula="{Status} = 'Review'",
+                fields=CONTENT_RECORD_FIELDS
             )
             return [self._to_content_record(r) for r in records]
         except Exception as e:
@@ -81,42 +184,56 @@ class AirtableClient:
         """Update record status and optional fields"""
         fields = {"Status": status}
 
-        # Map Python field names to Airtable field names
-        field_mapping = {
-            "postiz_post_id": "PostizPostId",
-            "published_at": "PublishedAt",
-            "image_url": "ImageURL",
-            "local_image_path": "LocalImagePath",
-            "error": "Error",
-        }
-
         for key, value in kwargs.items():
-            airtable_key = field_mapping.get(key, key)
+            airtable_key = _FIELD_MAPPING.get(key, key)
             fields[airtable_key] = value
 
         try:
             self.table.update(record_id, fields)
+            self._status_counts_cache = None
             logger.info(f"Updated record {record_id} to status {status}")
         except Exception as e:
             logger.error(f"Failed to update record {record_id}: {e}")
             raise
 
-    def set_image(self, record_id: str, image_url: str, local_path: str):
-        """Set generated image URL and path, move to Review status"""
-        self.table.update(record_id, {
+    @staticmethod
+    def image_fields(image_url: str, local_path: str) -> dict:
+        """Fields for a generated image - moves the record to Review status"""
+        return {
             "ImageURL": image_url,
             "LocalImagePath": local_path,
             "Status": "Review"
-        })
-        logger.info(f"Set image for record {record_id}")
+        }
 
-    def set_error(self, record_id: str, error: str):
-        """Mark record as failed with error message"""
-        self.table.update(record_id, {
+    @staticmethod
+    def error_fields(error: str) -> dict:
+        """Fields marking a record as failed with an error message"""
+        return {
             "Status": "Failed",
             "Error": error
-        })
-        logger.error(f"Record {record_id} failed: {error}")
+        }
+
+    def update_record(self, record_id: str, fields: dict):
+        """Write raw Airtable fields to a single record"""
+        try:
+            self.table.update(record_id, fields)
+            self._status_counts_cache = None
+        except Exception as e:
+            logger.error(f"Failed to update record {record_id}: {e}")
+            raise
+
+    def batch_update(self, updates: List[tuple[str, dict]]):
+        """Update several records at once - pyairtable sends them 10 per request"""
+        if not updates:
+            return
+
+        try:
+            self.table.batch_update([{"id": rid, "fields": f} for rid, f in updates])
+            self._status_counts_cache = None
+            logger.info(f"Batch updated {len(updates)} records")
+        except Exception as e:
+            logger.error(f"Failed to batch update {len(updates)} records: {e}")
+            raise
 
     def update_post_content(
         self,
@@ -142,11 +259,14 @@ class AirtableClient:
 
         if fields:
             self.table.update(record_id, fields)
+            if status is not None:
+                self._status_counts_cache = None
             logger.info(f"Updated post content for {record_id}")
 
     def delete_record(self, record_id: str):
         """Delete a record"""
         self.table.delete(record_id)
+        self._status_counts_cache = None
         logger.info(f"Deleted record {record_id}")
 
     def create_record(
@@ -178,6 +298,7 @@ class AirtableClient:
 
         try:
             record = self.table.create(fields)
+            self._status_counts_cache = None
             logger.info(f"Created record {record['id']}")
             return record["id"]
         except Exception as e:
@@ -189,7 +310,8 @@ class AirtableClient:
         try:
             records = self.table.all(
                 formula="OR({Status} = 'Review', {Status} = 'Approved', {Status} = 'Scheduled', {Status} = 'Published')",
-                sort=["-ScheduledDate"]
+                sort=["-ScheduledDate"],
+                fields=PUBLISHING_FIELDS
             )
             posts = []
             for record in records:
@@ -212,18 +334,57 @@ class AirtableClient:
             return []
 
     def get_status_counts(self) -> dict:
-        """Get count of records by status"""
+        """Get count of records by status (cached for STATUS_COUNTS_TTL seconds)"""
+        if self._status_counts_cache:
+            fetched_at, counts = self._status_counts_cache
+            if time.monotonic() - fetched_at < STATUS_COUNTS_TTL:
+                return counts
+
         try:
-            all_records = self.table.all()
+            # Only the Status field is needed to count
+            all_records = self.table.all(fields=["Status"])
             counts = {}
             for record in all_records:
                 status = record["fields"].get("Status", "Unknown")
                 counts[status] = counts.get(status, 0) + 1
+            self._status_counts_cache = (time.monotonic(), counts)
             return counts
         except Exception as e:
             logger.error(f"Failed to get status counts: {e}")
             return {}
 
+    async def aupdate_record(self, record_id: str, fields: dict):
+        """Async variant of update_record"""
+        await self._run(self.update_record, record_id, fields)
+
+    async def abatch_update(self, updates: List[tuple[str, dict]]):
+        """Async variant of batch_update"""
+        await self._run(self.batch_update, updates)
+
+    async def aget_status_counts(self) -> dict:
+        """Async variant of get_status_counts"""
+        return await self._run(self.get_status_counts)
+
+    async def aget_posts_for_publishing(self) -> List[dict]:
+        """Async variant of get_posts_for_publishing"""
+        return await self._run(self.get_posts_for_publishing)
+
+    async def aupdate_status(self, record_id: str, status: str, **kwargs):
+        """Async variant of update_status"""
+        await self._run(self.update_status, record_id, status, **kwargs)
+
+    async def aupdate_post_content(self, record_id: str, **kwargs):
+        """Async variant of update_post_content"""
+        await self._run(self.update_post_content, record_id, **kwargs)
+
+    async def adelete_record(self, record_id: str):
+        """Async variant of delete_record"""
+        await self._run(self.delete_record, record_id)
+
+    async def acreate_record(self, **kwargs) -> str:
+        """Async variant of create_record"""
+        return await self._run(self.create_record, **kwargs)
+
     def _to_content_record(self, record: dict) -> ContentRecord:
         """Convert Airtable record to ContentRecord model"""
         fields = record["fields"]
@@ -6,10 +6,18 @@ from datetime import datetime
 from typing import Optional
 import os
 
+from generation_service import generate_image
+
 from .airtable_client import AirtableClient, ContentRecord
 
 logger = logging.getLogger(__name__)
 
+# Max records generated in parallel per run
+GEN_CONCURRENCY = int(os.environ.get("GEN_CONCURRENCY", "4"))
+
+# Finished records are written back in batches of this size (Airtable's per-request limit)
+AIRTABLE_BATCH_SIZE = 10
+
 
 class ContentOrchestrator:
     """
@@ -18,9 +26,10 @@ class ContentOrchestrator:
     2. Process "Approved" records - schedule to social media (TODO: add scheduler)
     """
 
-    def __init__(self):
-        self._airtable: Optional[AirtableClient] = None
+    def __init__(self, airtable: Optional[AirtableClient] = None):
+        self._airtable = airtable
         self._running = False
+        self._public_base = os.environ.get("PUBLIC_URL", "http://localhost:8000")
 
     @property
     def airtable(self) -> AirtableClient:
@@ -31,35 +40,93 @@ class ContentOrchestrator:
 
     def get_public_url(self, filename: str) -> str:
         """Get public URL for an image file"""
-        public_base = os.environ.get("PUBLIC_URL", "http://localhost:8000")
-        return f"{public_base}/beta/{filename}"
+        return f"{self._public_base}/beta/{filename}"
 
-    async def process_pending_generations(self):
-        """Process all 'Idea' status records through generation"""
+    async def process_pending_generations(self) -> int:
+        """Process all 'Idea' status records through generation, returning how many were found"""
         if self._running:
             logger.warning("Generation job already running, skipping")
-            return
+            return 0
 
         self._running = True
+        records = []
         try:
-            records = self.airtable.get_pending_generations()
+            records = await self.airtable.aget_pending_generations()
             logger.info(f"Found {len(records)} records pending generation")
 
-            for record in records:
-                await self._process_generation(record)
+            if not records:
+                return 0
+
+            # Mark the whole run as Generating in one batched write
+            await self.airtable.abatch_update(
+                [(r.id, {"Status": "Generating"}) for r in records]
+            )
+
+            # Generate several records at once, bounded to stay under provider rate limits
+            sem = asyncio.Semaphore(GEN_CONCURRENCY)
+            finished: list[tuple[str, dict]] = []
+
+            async def guarded(record: ContentRecord):
+                # Every record needs a result written back - an escaped error becomes a Failed update
+                try:
+                    async with sem:
+                        result = await self._process_generation(record)
+                except asyncio.CancelledError:
+                    # Shutdown/reload mid-run - still record the outcome so it doesn't stay in Generating
+                    finished.append((record.id, AirtableClient.error_fields("Generation interrupted")))
+                    raise
+                except Exception as e:
+                    logger.error(f"Generation task failed for {record.id}: {e}")
+                    result = (record.id, AirtableClient.error_fields(str(e)))
+
+                finished.append(result)
+                if len(finished) >= AIRTABLE_BATCH_SIZE:
+                    await self._flush_updates(finished)
+
+            try:
+                await asyncio.gather(*(guarded(r) for r in records))
+            finally:
+                # Runs on cancellation too, writing the interrupted records collected above
+                await self._flush_updates(finished)
 
         except Exception as e:
             logger.error(f"Generation processing failed: {e}")
         finally:
             self._running = False
 
-    async def _process_generation(self, record: ContentRecord):
-        """Process a single record through generation"""
-        from ..generation_service import generate_image
+        return len(records)
+
+    async def _flush_updates(self, updates: list[tuple[str, dict]]):
+        """Write accumulated record updates to Airtable in one batch"""
+        if not updates:
+            return
 
+        # Take a snapshot so tasks finishing during the write start a new batch
+        batch = updates[:]
+        updates.clear()
+        try:
+            await self.airtable.abatch_update(batch)
+        except Exception as e:
+            # Every record here is already in Generating, which is never picked up again - don't drop them
+            logger.error(f"Failed to write results for {len(batch)} records, retrying one by one: {e}")
+            await asyncio.gather(*(self._write_result(record_id, fields) for record_id, fields in batch))
+
+    async def _write_result(self, record_id: str, fields: dict):
+        """Write one record's result, falling back to marking it Failed so it leaves Generating"""
+        try:
+            await self.airtable.aupdate_record(record_id, fields)
+            return
+        except Exception as e:
+            error = f"Failed to save result ({fields.get('LocalImagePath') or 'no image'}): {e}"
+
+        try:
+            await self.airtable.aupdate_record(record_id, AirtableClient.error_fields(error))
+        except Exception as e:
+            logger.error(f"Record {record_id} left in Generating: {e}")
+
+    async def _process_generation(self, record: ContentRecord) -> tuple[str, dict]:
+        """Generate the image for a single record, returning its Airtable update"""
         try:
-            # Update status to Generating
-            self.airtable.update_status(record.id, "Generating")
             logger.info(f"Generating image for record {record.id}: {record.title}")
 
             # Generate image
@@ -74,18 +141,12 @@ class ContentOrchestrator:
             # Construct public URL
             image_url = self.get_public_url(result["filename"])
 
-            # Update Airtable with image
-            self.airtable.set_image(
-                record.id,
-                image_url=image_url,
-                local_path=result["path"]
-            )
-
             logger.info(f"Generated image for record {record.id}: {result['filename']}")
+            return record.id, AirtableClient.image_fields(image_url, result["path"])
 
         except Exception as e:
             logger.error(f"Generation failed for {record.id}: {e}")
-            self.airtable.set_error(record.id, str(e))
+            return record.id, AirtableClient.error_fields(str(e))
 
     async def schedule_approved_posts(self):
         """
@@ -99,7 +160,7 @@ class ContentOrchestrator:
 
     async def get_pipeline_status(self) -> dict:
         """Get current status of the content pipeline"""
-        status_counts = self.airtable.get_status_counts()
+        status_counts = await self.airtable.aget_status_counts()
 
         return {
             "status_counts": status_counts,
@@ -113,9 +174,11 @@ class ContentOrchestrator:
 _orchestrator: Optional[ContentOrchestrator] = None
 
 
-def get_orchestrator() -> ContentOrchestrator:
-    """Get or create global orchestrator instance"""
+def get_orchestrator(airtable: Optional[AirtableClient] = None) -> ContentOrchestrator:
+    """Get or create global orchestrator instance, optionally handing it a shared Airtable client"""
     global _orchestrator
     if _orchestrator is None:
-        _orchestrator = ContentOrchestrator()
+        _orchestrator = ContentOrchestrator(airtable)
+    elif airtable is not None:
+        _orchestrator._airtable = airtable
     return _orchestrator
@@ -5,20 +5,24 @@ With Airtable integration for content planning
 """
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from pathlib import Path
-import json
-import base64
+import aiofiles
+import asyncio
+import orjson
+import pybase64
 import re
 import os
+import tempfile
 import logging
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, List
 
+import httpx
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -31,6 +35,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Imported after load_dotenv so module-level env settings (e.g. GEN_CONCURRENCY) are picked up
+from generation_service import close_http_client, generate_caption, reserve_path
+from integrations.airtable_client import AirtableClient
+from integrations.orchestrator import get_orchestrator
+
 # Paths - BETA_DIR can be overridden via env variable
 BASE_DIR = Path(__file__).parent.parent
 BETA_DIR = Path(os.environ.get("BETA_DIR", str(BASE_DIR / "beta")))
@@ -41,27 +50,160 @@ ARCHIVE_DIR = BETA_DIR / "archive"
 MANIFEST_PATH = BETA_DIR / "manifest.json"
 BATCHES_PATH = BETA_DIR / "batches.json"
 INCOGNITO_PATH = BETA_DIR / "incognito.json"
+BETA_RESOLVED = BETA_DIR.resolve()  # for path-traversal checks
 
 # Ensure directories exist
 TO_BE_PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 GENERATED_DIR.mkdir(parents=True, exist_ok=True)
 ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
 
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg')
+
+# Runs of characters not allowed in generated filenames
+PROMPT_CLEAN_RE = re.compile(r'[^a-zA-Z0-9]+')
+
+# Base64 characters decoded per write when saving - a multiple of 4 so each chunk decodes alone
+B64_DECODE_CHUNK = 64 * 1024
+
+
+def _scan_files(directory: Path, suffixes: tuple[str, ...]) -> list[tuple[os.DirEntry, os.stat_result]]:
+    """List files in a directory by suffix, newest first, with one stat() per file"""
+    try:
+        it = os.scandir(directory)
+    except FileNotFoundError:
+        return []
+
+    entries = []
+    with it:
+        for e in it:
+            if not e.name.lower().endswith(suffixes):
+                continue
+            # A file archived or cleaned up mid-scan is skipped, not fatal for the whole listing
+            try:
+                if e.is_file():
+                    entries.append((e, e.stat()))
+            except FileNotFoundError:
+                continue
+
+    entries.sort(key=lambda t: t[1].st_mtime, reverse=True)
+    return entries
+
+
+@lru_cache(maxsize=4096)
+def _load_sidecar(path: str, mtime_ns: int, size: int) -> dict:
+    """Parse a generated image's sidecar metadata - keyed on mtime and size so edits are picked up"""
+    # Errors propagate, so a failed read is never cached
+    return orjson.loads(Path(path).read_bytes())
+
+
+# ============ JSON State Files ============
+
+# Decoded manifest/batches/incognito files: path -> (mtime_ns, size, data)
+_json_cache: dict[Path, tuple[int, int, object]] = {}
+
+
+def _load_json(path: Path, default=None):
+    """Load a JSON state file, reusing the decoded object while the file is unchanged"""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        _json_cache.pop(path, None)
+        return default
+
+    cached = _json_cache.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+
+    data = orjson.loads(path.read_bytes())
+    _json_cache[path] = (st.st_mtime_ns, st.st_size, data)
+    return data
+
+
+# file -> entry index for the manifest list currently in the cache
+_manifest_index: dict = {"data": None, "index": {}}
+
+
+def _load_manifest() -> tuple[Optional[list], dict]:
+    """Load the manifest plus a file -> entry index, rebuilt only when the manifest changes"""
+    data = _load_json(MANIFEST_PATH)
+    if data is None:
+        return None, {}
+
+    if _manifest_index["data"] is not data:
+        index = {}
+        for item in data:
+            index.setdefault(item.get("file"), item)
+        _manifest_index["data"] = data
+        _manifest_index["index"] = index
+    return data, _manifest_index["index"]
+
+
+def _atomic_write(path: Path, data: bytes):
+    """Write via a temp file in the same directory and swap it in, so readers never see a partial file"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), 0o644)
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _save_json(path: Path, data):
+    """Write a compact JSON state file and keep its cache entry in step"""
+    try:
+        _atomic_write(path, orjson.dumps(data))
+    except Exception:
+        _json_cache.pop(path, None)
+        raise
+    st = path.stat()
+    _json_cache[path] = (st.st_mtime_ns, st.st_size, data)
+
 # ============ Background Scheduler Setup ============
 
 # Scheduler state
-scheduler = None
+generation_task: Optional[asyncio.Task] = None
+pending_event = asyncio.Event()
 SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "true").lower() == "true"
+GENERATION_POLL_MIN_SECONDS = 30
+GENERATION_POLL_MAX_SECONDS = 900
+current_interval = 300.0
 
 
-async def run_generation_job():
-    """Background job to process pending generations"""
-    from integrations.orchestrator import get_orchestrator
+async def run_generation_job() -> int:
+    """Background job to process pending generations, returning how many records were found"""
     try:
         orchestrator = get_orchestrator()
-        await orchestrator.process_pending_generations()
+        return await orchestrator.process_pending_generations()
     except Exception as e:
         logger.error(f"Generation job failed: {e}")
+        return 0
+
+
+async def _gen_loop():
+    """Run the generation job when woken by pending_event, or after current_interval seconds"""
+    global current_interval
+    while True:
+        try:
+            await asyncio.wait_for(pending_event.wait(), timeout=current_interval)
+        except asyncio.TimeoutError:
+            pass
+        pending_event.clear()
+
+        # Poll faster while work keeps arriving, back off while the queue stays empty
+        if await run_generation_job():
+            current_interval = max(GENERATION_POLL_MIN_SECONDS, current_interval / 2)
+        else:
+            current_interval = min(GENERATION_POLL_MAX_SECONDS, current_interval * 2)
+
+
+def _scheduler_running() -> bool:
+    return generation_task is not None and not generation_task.done()
 
 
 async def run_scheduling_job():
@@ -72,39 +214,50 @@ async def run_scheduling_job():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan - start/stop background scheduler"""
-    global scheduler
+    global generation_task
+
+    # Shared Airtable client - None when AIRTABLE_PAT / AIRTABLE_BASE_ID aren't set
+    try:
+        app.state.airtable = AirtableClient()
+    except ValueError as e:
+        logger.warning(f"Airtable disabled: {e}")
+        app.state.airtable = None
+
+    # The orchestrator shares it, so writes from handlers invalidate the status counts it serves
+    get_orchestrator(app.state.airtable)
 
     if SCHEDULER_ENABLED:
-        try:
-            from apscheduler.schedulers.asyncio import AsyncIOScheduler
-            from apscheduler.triggers.interval import IntervalTrigger
-
-            scheduler = AsyncIOScheduler()
-
-            # Add generation job - every 5 minutes
-            scheduler.add_job(
-                run_generation_job,
-                IntervalTrigger(minutes=5),
-                id="generation_job",
-                replace_existing=True,
-                max_instances=1
-            )
-            # Note: Scheduling job disabled - using Buffer manually
-
-            scheduler.start()
-            logger.info("Background scheduler started")
-        except ImportError:
-            logger.warning("APScheduler not installed - background jobs disabled")
-        except Exception as e:
-            logger.error(f"Failed to start scheduler: {e}")
+        # Generation loop - woken by trigger-generation, otherwise polls every 30s-15min
+        # Note: Scheduling job disabled - using Buffer manually
+        generation_task = asyncio.create_task(_gen_loop())
+        logger.info("Background scheduler started")
+
+    # Shared Replicate client - keeps the connection to api.replicate.com warm between requests
+    replicate_token = os.environ.get("REPLICATE_API_TOKEN")
+    app.state.replicate = httpx.AsyncClient(
+        base_url="https://api.replicate.com",
+        timeout=120.0,
+        http2=True,
+        headers={"Authorization": f"Bearer {replicate_token}"},
+    ) if replicate_token else None
 
     yield
 
     # Shutdown
-    if scheduler:
-        scheduler.shutdown()
+    if generation_task:
+        generation_task.cancel()
+        try:
+            await generation_task
+        except asyncio.CancelledError:
+            pass
+        generation_task = None
         logger.info("Background scheduler stopped")
 
+    if app.state.replicate:
+        await app.state.replicate.aclose()
+
+    await close_http_client()
+
 
 app = FastAPI(
     title="Lumière Studio API",
@@ -125,8 +278,7 @@ app.add_middleware(
 
 # ============ Models ============
 
-class SaveImageRequest(BaseModel):
-    image: str  # base64 or data URL
+class SaveImageMeta(BaseModel):
     prompt: str
     model: str
     refs: List[str] = []  # reference images used
@@ -135,6 +287,10 @@ class SaveImageRequest(BaseModel):
     character: str = "beta"
 
 
+class SaveImageRequest(SaveImageMeta):
+    image: str  # base64 or data URL
+
+
 class SaveGridImageRequest(BaseModel):
     image: str  # base64 or data URL
     base_filename: str  # original filename without extension
@@ -170,6 +326,7 @@ class Batch(BaseModel):
     color: str
     images: List[BatchImage] = []
     createdAt: int
+    updatedAt: Optional[int] = None
 
 
 class BatchSyncRequest(BaseModel):
@@ -178,88 +335,154 @@ class BatchSyncRequest(BaseModel):
 
 # ============ API Routes ============
 
+def _move_unique(src: Path, directory: Path) -> Path:
+    """Move src into directory without overwriting - the destination name is claimed with O_EXCL first"""
+    dest = reserve_path(directory, src.stem, src.suffix)
+    try:
+        os.replace(src, dest)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return dest
+
+
+def _reserve_generated_path(prompt: str, model: str) -> Path:
+    """Pick a free to-be-processed filename for a generated image and reserve it"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    # Clean prompt for filename (first 30 chars) - every run of whitespace/punctuation
+    # (including newlines) becomes a single dash in one pass
+    clean_prompt = PROMPT_CLEAN_RE.sub('-', prompt).strip('-')[:30].rstrip('-').lower()
+
+    # Get model short name
+    model_short = model.split('/')[-1].split('-')[0]
+
+    # Reserved before the write leaves the event loop, so a parallel save can't take it
+    return reserve_path(TO_BE_PROCESSED_DIR, f"{timestamp}_{model_short}_{clean_prompt}", ".png")
+
+
+def _image_metadata(meta: SaveImageMeta) -> dict:
+    """Sidecar metadata for a saved generated image"""
+    return {
+        "prompt": meta.prompt,
+        "model": meta.model,
+        "refs": meta.refs,
+        "aspect": meta.aspect,
+        "quality": meta.quality,
+        "createdAt": datetime.now().isoformat(),
+    }
+
+
+def _write_sidecar(filepath: Path, metadata: dict):
+    """Write an image's metadata sidecar JSON next to it"""
+    metadata_path = filepath.with_suffix('.json')
+    _atomic_write(metadata_path, orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+
+
+def _write_image(image_data: str, filepath: Path, metadata: Optional[dict] = None):
+    """Decode a base64/data URL image to disk, plus optional sidecar JSON (runs in a worker thread)"""
+    try:
+        # Handle base64 data URL or raw base64 - skip the header by offset, since
+        # split() would copy the whole payload
+        start = image_data.index(',') + 1 if image_data.startswith('data:') else 0
+
+        with open(filepath, 'wb') as f:
+            if '\n' in image_data:
+                # Line-wrapped base64 can't be cut on fixed boundaries - decode in one go
+                f.write(pybase64.b64decode(image_data[start:], validate=False))
+            else:
+                # Decode chunk by chunk so only one small decoded chunk is alive at a time
+                for i in range(start, len(image_data), B64_DECODE_CHUNK):
+                    f.write(pybase64.b64decode(image_data[i:i + B64_DECODE_CHUNK], validate=False))
+
+        if metadata is not None:
+            _write_sidecar(filepath, metadata)
+    except Exception:
+        # Don't leave the reserved empty file behind
+        filepath.unlink(missing_ok=True)
+        raise
+
+
 @app.get("/api/images/generated", response_model=List[GeneratedImage])
 async def list_generated_images():
     """List all images in the to-be-processed folder with metadata"""
     images = []
 
-    if TO_BE_PROCESSED_DIR.exists():
-        for f in sorted(TO_BE_PROCESSED_DIR.iterdir(), key=lambda x: x.stat().st_mtime, reverse=True):
-            if f.suffix.lower() == '.png':
-                # Try to load metadata from sidecar JSON
-                metadata_path = f.with_suffix('.json')
-                metadata = {}
-                if metadata_path.exists():
-                    try:
-                        metadata = json.loads(metadata_path.read_text())
-                    except Exception:
-                        pass
-
-                images.append(GeneratedImage(
-                    file=f"to-be-processed/{f.name}",
-                    tags=["generated", "new"],
-                    prompt=metadata.get("prompt"),
-                    model=metadata.get("model"),
-                    refs=metadata.get("refs", []),
-                    aspect=metadata.get("aspect"),
-                    quality=metadata.get("quality"),
-                    createdAt=metadata.get("createdAt"),
-                ))
+    # One scan picks up both the images and their sidecar JSON files
+    entries = _scan_files(TO_BE_PROCESSED_DIR, ('.png', '.json'))
+    sidecars = {
+        e.name[:-len('.json')]: (e.path, st.st_mtime_ns, st.st_size)
+        for e, st in entries if e.name.endswith('.json')
+    }
+
+    for entry, _ in entries:
+        if not entry.name.lower().endswith('.png'):
+            continue
+
+        # Load metadata from sidecar JSON (cached until the sidecar changes)
+        sidecar = sidecars.get(Path(entry.name).stem)
+        try:
+            metadata = _load_sidecar(*sidecar) if sidecar else {}
+        except (OSError, ValueError):
+            metadata = {}
+
+        # Plain dicts - response_model validates and serializes them in pydantic-core
+        images.append({
+            "file": f"to-be-processed/{entry.name}",
+            "tags": ["generated", "new"],
+            "prompt": metadata.get("prompt"),
+            "model": metadata.get("model"),
+            "refs": metadata.get("refs", []),
+            "aspect": metadata.get("aspect"),
+            "quality": metadata.get("quality"),
+            "createdAt": metadata.get("createdAt"),
+        })
 
     return images
 
 
-@app.post("/api/images/save")
+@app.post("/api/images/save", deprecated=True)
 async def save_image(request: SaveImageRequest):
-    """Save a generated image to the to-be-processed folder with metadata"""
-    try:
-        # Generate filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        timestamp_iso = datetime.now().isoformat()
-
-        # Clean prompt for filename (first 30 chars)
-        # Replace all whitespace (including newlines) with spaces first, then clean
-        clean_prompt = re.sub(r'\s+', ' ', request.prompt)  # Collapse all whitespace to single space
-        clean_prompt = re.sub(r'[^a-zA-Z0-9 ]', '', clean_prompt)[:30]
-        clean_prompt = clean_prompt.strip().replace(' ', '-').lower()
-
-        # Get model short name
-        model_short = request.model.split('/')[-1].split('-')[0]
-
-        filename = f"{timestamp}_{model_short}_{clean_prompt}.png"
-        filepath = TO_BE_PROCESSED_DIR / filename
-
-        # Handle filename collisions (important for parallel generations)
-        counter = 1
-        while filepath.exists():
-            filename = f"{timestamp}_{model_short}_{clean_prompt}_{counter}.png"
-            filepath = TO_BE_PROCESSED_DIR / filename
-            counter += 1
-
-        # Handle base64 data URL or raw base64
-        image_data = request.image
-        if image_data.startswith('data:'):
-            image_data = image_data.split(',')[1]
-
-        # Decode and save image
-        image_bytes = base64.b64decode(image_data)
-        filepath.write_bytes(image_bytes)
-
-        # Save metadata sidecar JSON
-        metadata = {
-            "prompt": request.prompt,
-            "model": request.model,
-            "refs": request.refs,
-            "aspect": request.aspect,
-            "quality": request.quality,
-            "createdAt": timestamp_iso,
+    """Save a base64 generated image with metadata (deprecated - use /api/images/save-raw)"""
+    try:
+        filepath = _reserve_generated_path(request.prompt, request.model)
+        await asyncio.to_thread(_write_image, request.image, filepath, _image_metadata(request))
+
+        return {
+            "success": True,
+            "filename": filepath.name,
+            "path": str(filepath)
         }
-        metadata_path = filepath.with_suffix('.json')
-        metadata_path.write_text(json.dumps(metadata, indent=2))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/images/save-raw")
+async def save_image_raw(image: UploadFile = File(...), meta: str = Form(...)):
+    """Save a generated image uploaded as raw bytes (multipart), with JSON metadata in `meta`"""
+    try:
+        request = SaveImageMeta.model_validate_json(meta)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        filepath = _reserve_generated_path(request.prompt, request.model)
+
+        # Stream the upload to disk in 1 MiB chunks - no base64 decode, no full in-memory copy
+        try:
+            async with aiofiles.open(filepath, 'wb') as f:
+                while chunk := await image.read(1 << 20):
+                    await f.write(chunk)
+        except Exception:
+            filepath.unlink(missing_ok=True)
+            raise
+
+        await asyncio.to_thread(_write_sidecar, filepath, _image_metadata(request))
 
         return {
             "success": True,
-            "filename": filename,
+            "filename": filepath.name,
             "path": str(filepath)
         }
 
@@ -271,29 +494,15 @@ async def save_image(request: SaveImageRequest):
 async def save_grid_image(request: SaveGridImageRequest):
     """Save a grid-cropped image with custom filename"""
     try:
-        # Generate filename based on original + index
-        filename = f"{request.base_filename}_{request.index}.png"
-        filepath = TO_BE_PROCESSED_DIR / filename
-
-        # Handle filename collisions
-        counter = 1
-        while filepath.exists():
-            filename = f"{request.base_filename}_{request.index}_{counter}.png"
-            filepath = TO_BE_PROCESSED_DIR / filename
-            counter += 1
-
-        # Handle base64 data URL or raw base64
-        image_data = request.image
-        if image_data.startswith('data:'):
-            image_data = image_data.split(',')[1]
+        # Generate filename based on original + index, reserved before the write leaves the event loop
+        filepath = reserve_path(TO_BE_PROCESSED_DIR, f"{request.base_filename}_{request.index}", ".png")
 
         # Decode and save
-        image_bytes = base64.b64decode(image_data)
-        filepath.write_bytes(image_bytes)
+        await asyncio.to_thread(_write_image, request.image, filepath)
 
         return {
             "success": True,
-            "filename": filename,
+            "filename": filepath.name,
             "path": str(filepath)
         }
 
@@ -311,33 +520,31 @@ class TagUpdateRequest(BaseModel):
 async def update_image_tag(request: TagUpdateRequest):
     """Add or remove a tag from an image in the manifest"""
     try:
-        if not MANIFEST_PATH.exists():
+        data, index = _load_manifest()
+        if data is None:
             raise HTTPException(status_code=404, detail="Manifest not found")
 
-        data = json.loads(MANIFEST_PATH.read_text())
-
         # Find the image in manifest
-        found = False
-        for item in data:
-            if item.get("file") == request.file:
-                found = True
-                tags = item.get("tags", [])
-                if request.action == "add" and request.tag not in tags:
-                    tags.append(request.tag)
-                elif request.action == "remove" and request.tag in tags:
-                    tags.remove(request.tag)
-                item["tags"] = tags
-                break
-
-        # If not in manifest, add it
-        if not found:
-            data.append({
+        item = index.get(request.file)
+        if item is not None:
+            # Insertion-ordered set: O(1) add/discard, keeps tag display order, drops duplicates
+            tags = dict.fromkeys(item.get("tags", []))
+            if request.action == "add":
+                tags[request.tag] = None
+            elif request.action == "remove":
+                tags.pop(request.tag, None)
+            item["tags"] = list(tags)
+        else:
+            # If not in manifest, add it
+            item = {
                 "file": request.file,
                 "tags": [request.tag] if request.action == "add" else []
-            })
+            }
+            data.append(item)
+            index[request.file] = item
 
         # Save manifest
-        MANIFEST_PATH.write_text(json.dumps(data, indent=2))
+        _save_json(MANIFEST_PATH, data)
 
         return {"success": True, "file": request.file, "tag": request.tag, "action": request.action}
 
@@ -345,55 +552,84 @@ async def update_image_tag(request: TagUpdateRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _scan_manifest() -> list:
+    """Manifest entries, or [] if the manifest can't be read"""
+    try:
+        return _load_json(MANIFEST_PATH, [])
+    except Exception as e:
+        logger.warning(f"Failed to load manifest: {e}")
+        return []
+
+
+def _scan_specific() -> list[str]:
+    """Image filenames in the specific folder, sorted by name"""
+    return sorted(entry.name for entry, _ in _scan_files(SPECIFIC_DIR, IMAGE_SUFFIXES))
+
+
+def _scan_beta_root() -> list[str]:
+    """Image filenames directly in the beta folder, newest first"""
+    return [entry.name for entry, _ in _scan_files(BETA_DIR, IMAGE_SUFFIXES)]
+
+
 @app.get("/api/images/library", response_model=List[LibraryImage])
 async def get_library():
     """Get the manifest.json library of reference images + specific folder + beta root images"""
     images = []
     seen_files = set()
 
+    # Scan all three sources in parallel, off the event loop (slow on a cold iCloud folder)
+    manifest_items, specific_names, beta_names = await asyncio.gather(
+        asyncio.to_thread(_scan_manifest),
+        asyncio.to_thread(_scan_specific),
+        asyncio.to_thread(_scan_beta_root),
+    )
+
     # Load from manifest
-    if MANIFEST_PATH.exists():
-        try:
-            data = json.loads(MANIFEST_PATH.read_text())
-            for item in data:
-                images.append(LibraryImage(**item))
-                seen_files.add(item.get("file", ""))
-        except Exception as e:
-            print(f"Warning: Failed to load manifest: {e}")
+    try:
+        for item in manifest_items:
+            images.append({
+                "file": item["file"],
+                "tags": item.get("tags", []),
+                "model": item.get("model"),
+                "prompt": item.get("prompt"),
+            })
+            seen_files.add(item["file"])
+    except Exception as e:
+        logger.warning(f"Malformed manifest entry, skipping the rest of the manifest: {e}")
 
     # Add images from specific folder (expressions)
-    if SPECIFIC_DIR.exists():
-        for f in sorted(SPECIFIC_DIR.iterdir()):
-            if f.suffix.lower() in ('.png', '.jpg', '.jpeg'):
-                file_path = f"specific/{f.name}"
-                if file_path not in seen_files:
-                    # Extract expression from filename like "01-happy.png"
-                    name = f.stem
-                    parts = name.split('-')
-                    expression = parts[1] if len(parts) > 1 else name
-                    images.append(LibraryImage(
-                        file=file_path,
-                        tags=["specific", "expression", expression]
-                    ))
-                    seen_files.add(file_path)
+    for entry_name in specific_names:
+        file_path = f"specific/{entry_name}"
+        if file_path not in seen_files:
+            # Extract expression from filename like "01-happy.png"
+            name = Path(entry_name).stem
+            parts = name.split('-')
+            expression = parts[1] if len(parts) > 1 else name
+            images.append({
+                "file": file_path,
+                "tags": ["specific", "expression", expression],
+                "model": None,
+                "prompt": None,
+            })
+            seen_files.add(file_path)
 
     # Add images from beta root folder (not in subfolders, not in manifest)
     # This catches files synced via iCloud like IMG_*.PNG
-    if BETA_DIR.exists():
-        for f in sorted(BETA_DIR.iterdir(), key=lambda x: x.stat().st_mtime, reverse=True):
-            if f.is_file() and f.suffix.lower() in ('.png', '.jpg', '.jpeg'):
-                if f.name not in seen_files:
-                    # Determine tags based on filename pattern
-                    tags = ["library"]
-                    if f.name.startswith("IMG_"):
-                        tags.append("ipad")
-                    elif f.name.startswith("2025"):
-                        tags.append("generated")
-                    images.append(LibraryImage(
-                        file=f.name,
-                        tags=tags
-                    ))
-                    seen_files.add(f.name)
+    for entry_name in beta_names:
+        if entry_name not in seen_files:
+            # Determine tags based on filename pattern
+            tags = ["library"]
+            if entry_name.startswith("IMG_"):
+                tags.append("ipad")
+            elif entry_name.startswith("2025"):
+                tags.append("generated")
+            images.append({
+                "file": entry_name,
+                "tags": tags,
+                "model": None,
+                "prompt": None,
+            })
+            seen_files.add(entry_name)
 
     return images
 
@@ -403,11 +639,10 @@ async def delete_image(file_path: str):
     """Move an image file to archive instead of deleting"""
     try:
         # Resolve the full path within BETA_DIR
-        full_path = BETA_DIR / file_path
+        full_path = (BETA_DIR / file_path).resolve()
 
-        # Security: ensure the path is within BETA_DIR
-        full_path = full_path.resolve()
-        if not str(full_path).startswith(str(BETA_DIR.resolve())):
+        # Security: ensure the path is within BETA_DIR (a string prefix would also match beta-other/)
+        if not full_path.is_relative_to(BETA_RESOLVED):
             raise HTTPException(status_code=403, detail="Access denied")
 
         if not full_path.exists():
@@ -417,14 +652,7 @@ async def delete_image(file_path: str):
             raise HTTPException(status_code=400, detail="Not a file")
 
         # Move to archive instead of deleting
-        archive_path = ARCHIVE_DIR / full_path.name
-        # Handle filename collisions
-        if archive_path.exists():
-            timestamp = datetime.now().strftime('%H%M%S')
-            archive_path = ARCHIVE_DIR / f"{full_path.stem}_{timestamp}{full_path.suffix}"
-
-        import shutil
-        shutil.move(str(full_path), str(archive_path))
+        archive_path = _move_unique(full_path, ARCHIVE_DIR)
 
         return {"success": True, "archived": file_path, "archive_path": f"archive/{archive_path.name}"}
     except HTTPException:
@@ -438,13 +666,17 @@ async def list_archived_images():
     """List all images in the archive folder"""
     images = []
 
-    if ARCHIVE_DIR.exists():
-        for f in sorted(ARCHIVE_DIR.iterdir(), key=lambda x: x.stat().st_mtime, reverse=True):
-            if f.suffix.lower() in ('.png', '.jpg', '.jpeg'):
-                images.append(GeneratedImage(
-                    file=f"archive/{f.name}",
-                    tags=["archived"]
-                ))
+    for entry, _ in _scan_files(ARCHIVE_DIR, IMAGE_SUFFIXES):
+        images.append({
+            "file": f"archive/{entry.name}",
+            "tags": ["archived"],
+            "prompt": None,
+            "model": None,
+            "refs": [],
+            "aspect": None,
+            "quality": None,
+            "createdAt": None,
+        })
 
     return images
 
@@ -459,14 +691,7 @@ async def restore_image(file_name: str):
             raise HTTPException(status_code=404, detail="File not found in archive")
 
         # Move back to to-be-processed
-        restore_path = TO_BE_PROCESSED_DIR / file_name
-        # Handle filename collisions
-        if restore_path.exists():
-            timestamp = datetime.now().strftime('%H%M%S')
-            restore_path = TO_BE_PROCESSED_DIR / f"{archive_path.stem}_{timestamp}{archive_path.suffix}"
-
-        import shutil
-        shutil.move(str(archive_path), str(restore_path))
+        restore_path = _move_unique(archive_path, TO_BE_PROCESSED_DIR)
 
         return {"success": True, "restored": f"to-be-processed/{restore_path.name}"}
     except HTTPException:
@@ -499,7 +724,7 @@ async def health_check():
         "status": "ok",
         "version": "2.1.0",
         "scheduler_enabled": SCHEDULER_ENABLED,
-        "scheduler_running": scheduler is not None and scheduler.running if scheduler else False
+        "scheduler_running": _scheduler_running()
     }
 
 
@@ -508,14 +733,11 @@ async def health_check():
 @app.get("/api/batches", response_model=List[Batch])
 async def get_batches():
     """Get all batches from server storage"""
-    if BATCHES_PATH.exists():
-        try:
-            data = json.loads(BATCHES_PATH.read_text())
-            return [Batch(**batch) for batch in data]
-        except Exception as e:
-            print(f"Warning: Failed to load batches: {e}")
-            return []
-    return []
+    try:
+        return _load_json(BATCHES_PATH, [])
+    except Exception as e:
+        print(f"Warning: Failed to load batches: {e}")
+        return []
 
 
 @app.post("/api/batches/sync")
@@ -524,24 +746,28 @@ async def sync_batches(request: BatchSyncRequest):
     try:
         # Load existing server batches
         server_batches = {}
-        if BATCHES_PATH.exists():
-            try:
-                data = json.loads(BATCHES_PATH.read_text())
-                server_batches = {b["id"]: b for b in data}
-            except Exception:
-                pass
-
-        # Merge: client batches take precedence, but we keep server-only batches
-        client_batches = {b.id: b.model_dump() for b in request.batches}
-
-        # Start with server batches, then update/add client batches
-        merged = {**server_batches, **client_batches}
+        try:
+            server_batches = {b["id"]: b for b in _load_json(BATCHES_PATH, [])}
+        except Exception:
+            pass
+
+        # Merge: client batches take precedence, but we keep server-only batches.
+        # Batches whose updatedAt matches the server copy are unchanged - reuse it instead of dumping.
+        merged = dict(server_batches)
+        changed = False
+        for b in request.batches:
+            server = server_batches.get(b.id)
+            if b.updatedAt is not None and server is not None and server.get("updatedAt") == b.updatedAt:
+                continue
+            merged[b.id] = b.model_dump()
+            changed = True
 
         # Convert to list and sort by createdAt
         result = sorted(merged.values(), key=lambda x: x["createdAt"])
 
-        # Save to file
-        BATCHES_PATH.write_text(json.dumps(result, indent=2))
+        # Save to file (skipped on a no-op sync)
+        if changed:
+            _save_json(BATCHES_PATH, result)
 
         return {
             "success": True,
@@ -557,7 +783,7 @@ async def save_batches(request: BatchSyncRequest):
     """Save batches (full replace)"""
     try:
         data = [b.model_dump() for b in request.batches]
-        BATCHES_PATH.write_text(json.dumps(data, indent=2))
+        _save_json(BATCHES_PATH, data)
         return {"success": True, "count": len(data)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -573,10 +799,8 @@ class IncognitoRequest(BaseModel):
 async def get_incognito_images():
     """Get list of incognito (hidden) images"""
     try:
-        if INCOGNITO_PATH.exists():
-            data = json.loads(INCOGNITO_PATH.read_text())
-            return {"images": data.get("images", [])}
-        return {"images": []}
+        data = _load_json(INCOGNITO_PATH, {})
+        return {"images": data.get("images", [])}
     except Exception as e:
         logger.error(f"Failed to load incognito images: {e}")
         return {"images": []}
@@ -586,7 +810,7 @@ async def get_incognito_images():
 async def save_incognito_images(request: IncognitoRequest):
     """Save incognito images list"""
     try:
-        INCOGNITO_PATH.write_text(json.dumps({"images": request.images}, indent=2))
+        _save_json(INCOGNITO_PATH, {"images": request.images})
         return {"success": True, "count": len(request.images)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -594,6 +818,14 @@ async def save_incognito_images(request: IncognitoRequest):
 
 # ============ Social Media Pipeline ============
 
+def _require_airtable() -> AirtableClient:
+    """Shared Airtable client, or 503 if Airtable isn't configured"""
+    airtable = app.state.airtable
+    if airtable is None:
+        raise HTTPException(status_code=503, detail="Airtable not configured")
+    return airtable
+
+
 class SendToAirtableRequest(BaseModel):
     file: str
     title: str
@@ -606,18 +838,15 @@ class SendToAirtableRequest(BaseModel):
 @app.post("/api/social/send-to-airtable")
 async def send_to_airtable(request: SendToAirtableRequest):
     """Send an image from the library to Airtable for scheduling"""
+    airtable = _require_airtable()
     try:
-        from integrations.airtable_client import AirtableClient
-
-        airtable = AirtableClient()
-
         # Construct public URL
         public_base = os.environ.get("PUBLIC_URL", "http://localhost:8000")
         image_url = f"{public_base}/beta/{request.file}"
         local_path = str(BETA_DIR / request.file)
 
         # Create record in Airtable with Review status (skip generation)
-        record_id = airtable.create_record(
+        record_id = await airtable.acreate_record(
             title=request.title,
             image_url=image_url,
             local_path=local_path,
@@ -645,12 +874,10 @@ async def get_social_channels():
 async def get_pipeline_status():
     """Get current status of the content pipeline"""
     try:
-        from integrations.orchestrator import get_orchestrator
-
         orchestrator = get_orchestrator()
         status = await orchestrator.get_pipeline_status()
         status["scheduler_enabled"] = SCHEDULER_ENABLED
-        status["scheduler_running"] = scheduler is not None and scheduler.running if scheduler else False
+        status["scheduler_running"] = _scheduler_running()
         return status
     except ValueError as e:
         # Airtable not configured
@@ -670,9 +897,12 @@ async def get_pipeline_status():
 @app.post("/api/social/trigger-generation")
 async def trigger_generation():
     """Manually trigger generation processing"""
-    try:
-        from integrations.orchestrator import get_orchestrator
+    if _scheduler_running():
+        # Wake the background loop instead of running a second job alongside it
+        pending_event.set()
+        return {"success": True, "message": "Generation job triggered"}
 
+    try:
         orchestrator = get_orchestrator()
         await orchestrator.process_pending_generations()
         return {"success": True, "message": "Generation job completed"}
@@ -690,11 +920,12 @@ async def trigger_scheduling():
 @app.get("/api/social/pending-posts")
 async def get_pending_posts():
     """Get all posts pending review or ready to publish"""
-    try:
-        from integrations.airtable_client import AirtableClient
+    airtable = app.state.airtable
+    if airtable is None:
+        return {"posts": [], "error": "Airtable not configured"}
 
-        airtable = AirtableClient()
-        posts = airtable.get_posts_for_publishing()
+    try:
+        posts = await airtable.aget_posts_for_publishing()
         return {"posts": posts}
     except ValueError as e:
         # Airtable not configured
@@ -707,11 +938,9 @@ async def get_pending_posts():
 @app.post("/api/social/mark-posted/{record_id}")
 async def mark_as_posted(record_id: str):
     """Mark a post as published"""
+    airtable = _require_airtable()
     try:
-        from integrations.airtable_client import AirtableClient
-
-        airtable = AirtableClient()
-        airtable.update_status(record_id, "Published")
+        await airtable.aupdate_status(record_id, "Published")
         return {"success": True, "record_id": record_id}
     except Exception as e:
         logger.error(f"Failed to mark as posted: {e}")
@@ -729,11 +958,9 @@ class UpdatePostRequest(BaseModel):
 @app.patch("/api/social/posts/{record_id}")
 async def update_post(record_id: str, request: UpdatePostRequest):
     """Update a post's content (caption, hashtags, platforms, etc.)"""
+    airtable = _require_airtable()
     try:
-        from integrations.airtable_client import AirtableClient
-
-        airtable = AirtableClient()
-        airtable.update_post_content(
+        await airtable.aupdate_post_content(
             record_id,
             caption=request.caption,
             hashtags=request.hashtags,
@@ -750,11 +977,9 @@ async def update_post(record_id: str, request: UpdatePostRequest):
 @app.delete("/api/social/posts/{record_id}")
 async def delete_post(record_id: str):
     """Delete a post from the queue"""
+    airtable = _require_airtable()
     try:
-        from integrations.airtable_client import AirtableClient
-
-        airtable = AirtableClient()
-        airtable.delete_record(record_id)
+        await airtable.adelete_record(record_id)
         return {"success": True, "record_id": record_id}
     except Exception as e:
         logger.error(f"Failed to delete post: {e}")
@@ -779,44 +1004,43 @@ class ReplicateRequest(BaseModel):
 @app.post("/api/replicate/z-image-turbo")
 async def replicate_z_image_turbo(request: ReplicateRequest):
     """Proxy to Replicate API for z-image-turbo model"""
-    import httpx
-
-    replicate_token = os.environ.get("REPLICATE_API_TOKEN")
-    if not replicate_token:
+    client = app.state.replicate
+    if client is None:
         raise HTTPException(status_code=500, detail="REPLICATE_API_TOKEN not configured")
 
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                "https://api.replicate.com/v1/models/prunaai/z-image-turbo/predictions",
-                headers={
-                    "Authorization": f"Bearer {replicate_token}",
-                    "Content-Type": "application/json",
-                    "Prefer": "wait",
-                },
-                json={
-                    "input": {
-                        "prompt": request.prompt,
-                        "width": request.width,
-                        "height": request.height,
-                        "num_inference_steps": request.num_inference_steps,
-                        "output_format": "jpg",
-                        "output_quality": 95,
-                    }
-                },
-            )
-
-            data = response.json()
-
-            if response.status_code != 200 and response.status_code != 201:
-                logger.error(f"Replicate API error: {data}")
-                raise HTTPException(status_code=response.status_code, detail=data.get("error", "Replicate API error"))
-
-            # Return the output URL(s)
-            return {
-                "output": data.get("output"),
-                "status": data.get("status"),
-            }
+        # Stream so the body is read as it arrives while Replicate holds the connection (Prefer: wait)
+        async with client.stream(
+            "POST",
+            "/v1/models/prunaai/z-image-turbo/predictions",
+            headers={
+                "Content-Type": "application/json",
+                "Prefer": "wait",
+            },
+            json={
+                "input": {
+                    "prompt": request.prompt,
+                    "width": request.width,
+                    "height": request.height,
+                    "num_inference_steps": request.num_inference_steps,
+                    "output_format": "jpg",
+                    "output_quality": 95,
+                }
+            },
+        ) as response:
+            body = await response.aread()
+
+        data = orjson.loads(body)
+
+        if response.status_code != 200 and response.status_code != 201:
+            logger.error(f"Replicate API error: {data}")
+            raise HTTPException(status_code=response.status_code, detail=data.get("error", "Replicate API error"))
+
+        # Return the output URL(s)
+        return {
+            "output": data.get("output"),
+            "status": data.get("status"),
+        }
 
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Replicate API timeout")
@@ -829,8 +1053,6 @@ async def replicate_z_image_turbo(request: ReplicateRequest):
 async def generate_caption_endpoint(request: GenerateCaptionRequest):
     """Generate caption and hashtags for an image using Gemini"""
     try:
-        from generation_service import generate_caption
-
         result = await generate_caption(
             image_path=request.file,
             platforms=request.platforms,
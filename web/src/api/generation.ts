@@ -356,12 +356,9 @@ export async function saveGeneratedImage(params: {
   aspect?: string;
   quality?: string;
 }): Promise<void> {
-  let base64 = params.imageUrl;
-  if (!params.imageUrl.startsWith('data:')) {
-    base64 = await imageToBase64(params.imageUrl);
-  }
+  // saveImage uploads raw bytes, so remote URLs no longer need a base64 round-trip
   await saveImage({
-    image: base64,
+    image: params.imageUrl,
     prompt: params.prompt,
     model: params.model,
     refs: params.refs || [],
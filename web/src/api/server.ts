@@ -23,10 +23,17 @@ export async function saveImage(params: {
   aspect?: string;
   quality?: string;
 }): Promise<{ success: boolean; filename: string; path: string }> {
-  const res = await fetch(API.LOCAL_SAVE, {
+  // Upload raw bytes instead of a base64 JSON body (works for data URLs and http URLs)
+  const { image, ...meta } = params;
+  const blob = await (await fetch(image)).blob();
+
+  const form = new FormData();
+  form.append('image', blob, 'image.png');
+  form.append('meta', JSON.stringify(meta));
+
+  const res = await fetch(API.LOCAL_SAVE_RAW, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(params),
+    body: form,
   });
   if (!res.ok) throw new Error('Failed to save image');
   return res.json();
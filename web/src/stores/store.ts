@@ -245,6 +245,7 @@ export const useStore = create<StudioStore>()(
               color: BATCH_COLORS[colorIndex],
               images: [],
               createdAt: Date.now(),
+              updatedAt: Date.now(),
             },
           ],
         }));
@@ -254,7 +255,7 @@ export const useStore = create<StudioStore>()(
       renameBatch: (id, name) => {
         set((state) => ({
           batches: state.batches.map((b) =>
-            b.id === id ? { ...b, name } : b
+            b.id === id ? { ...b, name, updatedAt: Date.now() } : b
           ),
         }));
         get()._saveBatchesToServer();
@@ -270,7 +271,7 @@ export const useStore = create<StudioStore>()(
         set((state) => ({
           batches: state.batches.map((b) =>
             b.id === batchId && !b.images.some((img) => img.file === file)
-              ? { ...b, images: [...b.images, { file, addedAt: Date.now() }] }
+              ? { ...b, images: [...b.images, { file, addedAt: Date.now() }], updatedAt: Date.now() }
               : b
           ),
         }));
@@ -280,7 +281,7 @@ export const useStore = create<StudioStore>()(
         set((state) => ({
           batches: state.batches.map((b) =>
             b.id === batchId
-              ? { ...b, images: b.images.filter((img) => img.file !== file) }
+              ? { ...b, images: b.images.filter((img) => img.file !== file), updatedAt: Date.now() }
               : b
           ),
         }));
@@ -58,6 +58,7 @@ export interface Batch {
   color: string;
   images: BatchImage[];
   createdAt: number;
+  updatedAt?: number;
 }
 
 export interface BatchImage {
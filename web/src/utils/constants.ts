@@ -80,7 +80,7 @@ export const API = {
   OPENROUTER: 'https://openrouter.ai/api/v1/chat/completions',
   OPENAI_IMAGES: 'https://api.openai.com/v1/images/generations',
   LOCAL_GENERATED: '/api/images/generated',
-  LOCAL_SAVE: '/api/images/save',
+  LOCAL_SAVE_RAW: '/api/images/save-raw',
   LOCAL_LIBRARY: '/api/images/library',
 } as const;
 